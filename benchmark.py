@@ -0,0 +1,64 @@
+"""
+Benchmark draft vs final latency for every resolution preset.
+
+Usage:
+    export FAL_KEY="..."
+    python benchmark.py YOUR_TEAM/kora-edit --image-url https://example.com/character.jpg --runs 3
+"""
+import argparse
+import statistics
+import time
+
+import fal_client
+
+from presets import RESOLUTION_PRESETS, billable_units, draft_dimensions
+
+DEFAULT_PROMPT = "Make this person on the image standing on a ground between flower plants"
+
+
+def time_request(app_id: str, arguments: dict) -> float:
+    start = time.perf_counter()
+    fal_client.subscribe(app_id, arguments=arguments)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app_id", help="Deployed app id, e.g. YOUR_TEAM/kora-edit")
+    parser.add_argument("--image-url", required=True, help="Character image used for every request")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per preset and quality")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--upscale-draft", action="store_true", help="Upscale drafts to the preset size")
+    args = parser.parse_args()
+
+    # One untimed request so cold start and model loading don't skew the first preset
+    time_request(args.app_id, {"prompt": args.prompt, "image_url": args.image_url, "seed": args.seed})
+
+    print(f"{'preset':<16}{'final (s)':>12}{'draft (s)':>12}{'saving':>10}{'units':>14}")
+    for preset, resolution in RESOLUTION_PRESETS.items():
+        medians = {}
+        for quality in ("final", "draft"):
+            arguments = {
+                "prompt": args.prompt,
+                "image_url": args.image_url,
+                "seed": args.seed,
+                "resolution": preset,
+                "quality": quality,
+                "upscale_draft": args.upscale_draft,
+            }
+            medians[quality] = statistics.median(
+                time_request(args.app_id, arguments) for _ in range(args.runs)
+            )
+
+        saving = 1 - medians["draft"] / medians["final"]
+        final_units = billable_units(resolution["width"], resolution["height"])
+        draft_units = billable_units(*draft_dimensions(resolution["width"], resolution["height"]))
+        print(
+            f"{preset:<16}{medians['final']:>12.2f}{medians['draft']:>12.2f}"
+            f"{saving:>10.0%}{final_units + ' -> ' + draft_units:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
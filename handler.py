@@ -13,12 +13,16 @@ import os
 import copy
 import random
 import tempfile
+import threading
+import time
+from collections import deque
 from io import BytesIO
 from PIL import Image as PILImage
 from pydantic import BaseModel, Field
 from typing import Literal
 from comfy_models import MODEL_LIST
 from workflow import WORKFLOW_JSON
+from presets import RESOLUTION_PRESETS, billable_units, draft_dimensions
 
 # -------------------------------------------------
 # Container setup
@@ -29,18 +33,13 @@ custom_image = ContainerImage.from_dockerfile(dockerfile_path)
 
 COMFY_HOST = "127.0.0.1:8188"
 
-# -------------------------------------------------
-# Resolution Presets
-# -------------------------------------------------
-RESOLUTION_PRESETS = {
-    "hd": {"width": 720, "height": 1280},
-    "square": {"width": 1024, "height": 1024},
-    "squareHD": {"width": 2048, "height": 2048},
-    "portrait_3_4": {"width": 1536, "height": 2048},
-    "portrait_9_16": {"width": 1152, "height": 2048},
-    "landscape_16_9": {"width": 2048, "height": 1152},
-    "landscape_4_3": {"width": 2048, "height": 1536}
-}
+# Cheap resize used to bring drafts back to the preset size
+DRAFT_UPSCALE_METHOD = "bilinear"
+
+# Resource telemetry: one sample every TELEMETRY_INTERVAL seconds,
+# keeping the last TELEMETRY_WINDOW samples (10 minutes by default).
+TELEMETRY_INTERVAL = float(os.environ.get("TELEMETRY_INTERVAL", "1.0"))
+TELEMETRY_WINDOW = int(os.environ.get("TELEMETRY_WINDOW", "600"))
 
 
 # -------------------------------------------------
@@ -67,7 +66,6 @@ def download_if_missing(url, path):
                 f.write(chunk)
 
 def check_server(url, retries=500, delay=0.1):
-    import time
     for _ in range(retries):
         try:
             if requests.get(url).status_code == 200:
@@ -99,6 +97,94 @@ def upload_images(images):
         r = requests.post(f"http://{COMFY_HOST}/upload/image", files=files)
         r.raise_for_status()
 
+def process_rss_mb(pid) -> float | None:
+    """Resident set size of a process in MB, read from /proc."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+class ResourceSampler:
+    """Background thread that polls ComfyUI and process memory into a rolling time series."""
+
+    def __init__(self, comfy_pid=None, interval=TELEMETRY_INTERVAL, window=TELEMETRY_WINDOW):
+        self.comfy_pid = comfy_pid
+        self.interval = interval
+        self.window = window
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self) -> dict:
+        sample = {"time": time.time(), **self.rss()}
+
+        try:
+            stats = requests.get(f"http://{COMFY_HOST}/system_stats", timeout=2).json()
+            device = (stats.get("devices") or [{}])[0]
+            mb = 1024 * 1024
+            sample["vram_total_mb"] = device.get("vram_total", 0) / mb
+            sample["vram_used_mb"] = (device.get("vram_total", 0) - device.get("vram_free", 0)) / mb
+            sample["torch_vram_total_mb"] = device.get("torch_vram_total", 0) / mb
+            sample["torch_vram_used_mb"] = (
+                device.get("torch_vram_total", 0) - device.get("torch_vram_free", 0)
+            ) / mb
+            system = stats.get("system", {})
+            if "ram_total" in system:
+                sample["ram_used_mb"] = (system["ram_total"] - system.get("ram_free", 0)) / mb
+        except Exception:
+            pass
+
+        try:
+            queue = requests.get(f"http://{COMFY_HOST}/queue", timeout=2).json()
+            sample["queue_running"] = len(queue.get("queue_running", []))
+            sample["queue_pending"] = len(queue.get("queue_pending", []))
+        except Exception:
+            pass
+
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    def rss(self) -> dict:
+        """Current RSS of the handler and ComfyUI processes, read from /proc only."""
+        return {
+            "handler_rss_mb": process_rss_mb("self"),
+            "comfy_rss_mb": process_rss_mb(self.comfy_pid) if self.comfy_pid else None,
+        }
+
+    def series(self, since: float = 0.0) -> list:
+        with self._lock:
+            return [s for s in self.samples if s["time"] >= since]
+
+    def peaks(self, since: float, extra: dict | None = None) -> dict:
+        """Peak VRAM/RSS over samples taken since the given timestamp, plus an optional off-series reading."""
+        samples = self.series(since)
+        if extra:
+            samples = samples + [extra]
+        peaks = {}
+        for key in ("vram_used_mb", "torch_vram_used_mb", "handler_rss_mb", "comfy_rss_mb", "queue_pending"):
+            values = [s[key] for s in samples if s.get(key) is not None]
+            if values:
+                peaks[f"peak_{key}"] = round(max(values), 1)
+        peaks["samples"] = len(samples) - (1 if extra else 0)
+        return peaks
+
 def apply_fixed_values(workflow: dict, seed_value: int):
     for node in workflow.values():
         inputs = node.get("inputs", {})
@@ -156,6 +242,16 @@ class CharacterInput(BaseModel):
         title="NSFW Mode",
         description="Enable NSFW content generation. If false, NSFW LoRA strength is set to 0."
     )
+    quality: Literal["draft", "final"] = Field(
+        default="final",
+        title="Quality",
+        description="final renders at the full preset resolution. draft renders at half the preset width and height (about 4x less compute) for fast prompt iteration.",
+    )
+    upscale_draft: bool = Field(
+        default=False,
+        title="Upscale Draft",
+        description="Only used with quality=draft. If true, the draft render is cheaply upscaled to the preset resolution. Billing still follows the pixels actually generated.",
+    )
 
 # -------------------------------------------------
 # Output Model
@@ -237,6 +333,27 @@ class KoraEdit(
         if not check_server(f"http://{COMFY_HOST}/system_stats"):
             raise RuntimeError("ComfyUI failed to start")
 
+        # Start resource telemetry
+        self.sampler = ResourceSampler(comfy_pid=self.comfy.pid)
+        self.sampler.start()
+
+    @fal.endpoint("/diagnostics")
+    def diagnostics(self) -> dict:
+        """Rolling VRAM, RAM, RSS and ComfyUI queue samples for capacity tuning."""
+        series = self.sampler.series()
+        since = series[0]["time"] if series else time.time()
+        return {
+            "interval": self.sampler.interval,
+            "window": self.sampler.window,
+            "latest": series[-1] if series else None,
+            "peaks": self.sampler.peaks(since),
+            "series": series,
+        }
+
+    def teardown(self):
+        self.sampler.stop()
+        self.comfy.terminate()
+
     @fal.endpoint("/")
     async def generate(
         self, 
@@ -244,6 +361,8 @@ class KoraEdit(
         response: Response
     ) -> CharacterOutput:
         """Generate character image based on input parameters."""
+        started = time.time()
+        status, error = "ok", None
         try:
             job = copy.deepcopy(WORKFLOW_JSON)
             workflow = job["input"]["workflow"]
@@ -265,8 +384,28 @@ class KoraEdit(
 
             # Get width and height from resolution preset (node 102)
             resolution = RESOLUTION_PRESETS[input.resolution]
-            workflow["102"]["inputs"]["width"] = resolution["width"]
-            workflow["102"]["inputs"]["height"] = resolution["height"]
+            gen_width, gen_height = resolution["width"], resolution["height"]
+            if input.quality == "draft":
+                gen_width, gen_height = draft_dimensions(gen_width, gen_height)
+            workflow["102"]["inputs"]["width"] = gen_width
+            workflow["102"]["inputs"]["height"] = gen_height
+
+            # Optionally upscale the draft to the preset size before saving (node 121)
+            if input.quality == "draft" and input.upscale_draft:
+                workflow["130"] = {
+                    "inputs": {
+                        "upscale_method": DRAFT_UPSCALE_METHOD,
+                        "width": resolution["width"],
+                        "height": resolution["height"],
+                        "crop": "center",
+                        "image": ["106", 0]
+                    },
+                    "class_type": "ImageScale",
+                    "_meta": {
+                        "title": "Upscale Draft"
+                    }
+                }
+                workflow["121"]["inputs"]["images"] = ["130", 0]
 
             # Update NSFW LoRA strength (node 116)
             lora_strength = 1.0 if input.nsfw else 0.0
@@ -287,6 +426,7 @@ class KoraEdit(
             if resp.status_code != 200:
                 error_detail = resp.text
                 print(f"ComfyUI Error Response: {error_detail}")
+                status, error = "rejected", error_detail
                 return {"error": f"ComfyUI rejected workflow: {error_detail}"}
             
             prompt_id = resp.json()["prompt_id"]
@@ -337,10 +477,8 @@ class KoraEdit(
 
             ws.close()
             
-            # Set billing units based on resolution
-            resolution = RESOLUTION_PRESETS[input.resolution]
-            resolution_factor = (resolution["width"] * resolution["height"]) / (1024 * 1024)
-            response.headers["x-fal-billable-units"] = str(int(resolution_factor))
+            # Set billing units based on the pixels actually generated
+            response.headers["x-fal-billable-units"] = billable_units(gen_width, gen_height)
             
             return CharacterOutput(
                 image=output_image, 
@@ -349,7 +487,21 @@ class KoraEdit(
             )
 
         except Exception as e:
+            status, error = "error", str(e)
             traceback.print_exc()
             # Re-raise as HTTPException for proper error handling
             from fastapi import HTTPException
             raise HTTPException(status_code=500, detail=str(e))
+
+        finally:
+            # Log peak resource usage observed while this request ran, one line per request.
+            # Only /proc RSS is read inline; VRAM and queue peaks come from the background series.
+            print(json.dumps({
+                "event": "request_resources",
+                "status": status,
+                "error": error,
+                "resolution": input.resolution,
+                "quality": input.quality,
+                "duration_s": round(time.time() - started, 2),
+                **self.sampler.peaks(started, extra=self.sampler.rss()),
+            }))
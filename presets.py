@@ -0,0 +1,44 @@
+from math import gcd
+
+# -------------------------------------------------
+# Resolution Presets
+# -------------------------------------------------
+RESOLUTION_PRESETS = {
+    "hd": {"width": 720, "height": 1280},
+    "square": {"width": 1024, "height": 1024},
+    "squareHD": {"width": 2048, "height": 2048},
+    "portrait_3_4": {"width": 1536, "height": 2048},
+    "portrait_9_16": {"width": 1152, "height": 2048},
+    "landscape_16_9": {"width": 2048, "height": 1152},
+    "landscape_4_3": {"width": 2048, "height": 1536}
+}
+
+# Draft renders run the latent at about half the preset width and height.
+# Flux 2 latents need dimensions that are multiples of 16.
+DRAFT_SCALE = 0.5
+LATENT_MULTIPLE = 16
+
+
+def draft_dimensions(width: int, height: int) -> tuple[int, int]:
+    """Largest latent-grid size at or below DRAFT_SCALE that keeps the preset's exact aspect ratio."""
+    divisor = gcd(width, height)
+    ratio_w, ratio_h = width // divisor, height // divisor
+    # Smallest multiplier that puts both sides on the latent grid
+    step_w = LATENT_MULTIPLE // gcd(ratio_w, LATENT_MULTIPLE)
+    step_h = LATENT_MULTIPLE // gcd(ratio_h, LATENT_MULTIPLE)
+    step = step_w * step_h // gcd(step_w, step_h)
+    multiplier = max(step, int(width * DRAFT_SCALE) // ratio_w // step * step)
+    return ratio_w * multiplier, ratio_h * multiplier
+
+
+def billable_units(width: int, height: int) -> str:
+    """Billing units are megapixels actually generated, relative to 1024x1024."""
+    resolution_factor = (width * height) / (1024 * 1024)
+    return f"{round(resolution_factor, 2):g}"
+
+
+# Drafts are upscaled back to the preset size, so they must not distort it
+for _name, _preset in RESOLUTION_PRESETS.items():
+    _draft_w, _draft_h = draft_dimensions(_preset["width"], _preset["height"])
+    if _draft_w * _preset["height"] != _draft_h * _preset["width"]:
+        raise ValueError(f"Draft size {_draft_w}x{_draft_h} changes the aspect ratio of preset {_name}")